@@ -0,0 +1,106 @@
+import operator
+from collections import defaultdict
+from functools import reduce
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from places.models import Place
+from places.spatial import SpatialIndex
+
+from .commit_hooks import merge_on_commit
+from .menu_index import MenuIndex
+from .models import Order, OrderCandidate, Restaurant
+
+
+def build_restaurants_index(restaurants):
+    restaurants_coordinates = {
+        address: (lat, lon) for address, lat, lon in
+        Place.objects
+        .filter(address__in=[restaurant.address for restaurant in restaurants], lat__isnull=False)
+        .values_list('address', 'lat', 'lon')
+    }
+    located_restaurants = [
+        restaurant for restaurant in restaurants
+        if restaurant.address in restaurants_coordinates
+    ]
+    return SpatialIndex(
+        [restaurant.id for restaurant in located_restaurants],
+        [restaurants_coordinates[restaurant.address] for restaurant in located_restaurants],
+        radius_km=settings.ORDER_CANDIDATES_RADIUS_KM
+    )
+
+
+def refresh_candidates(orders=None):
+    if orders is None:
+        orders = Order.objects.filter(processing_status='not_processed')
+    orders = list(orders.with_coordinates().prefetch_related('order_items'))
+
+    orders_by_basket = defaultdict(list)
+    for order in orders:
+        basket = frozenset(order_item.product_id for order_item in order.order_items.all())
+        # an order without items has nothing to cook
+        if order.lat is None or not basket:
+            continue
+        orders_by_basket[basket].append(order)
+
+    candidates = []
+    if orders_by_basket:
+        # only the menus of the ordered products are loaded, which keeps a
+        # refresh of a single new order cheap
+        menu_index = MenuIndex.build(product_ids=set().union(*orders_by_basket))
+        restaurants_index = build_restaurants_index(
+            Restaurant.objects.filter(id__in=menu_index.restaurant_ids)
+        )
+        for basket, basket_orders in orders_by_basket.items():
+            suitable_restaurant_ids = set(menu_index.get_restaurants_for(basket))
+            for order in basket_orders:
+                nearest_restaurants = restaurants_index.nearest(
+                    order.lat, order.lon,
+                    limit=settings.ORDER_CANDIDATES_LIMIT,
+                    keys=suitable_restaurant_ids
+                )
+                candidates.extend(
+                    OrderCandidate(order=order, restaurant_id=restaurant_id, distance=round(distance, 2))
+                    for distance, restaurant_id in nearest_restaurants
+                )
+
+    with transaction.atomic():
+        # Concurrent refreshes of the same orders, e.g. by the geocoding
+        # worker and an admin save, take turns here; otherwise the second
+        # insert collides with the first on (order, restaurant).
+        order_ids = set(
+            Order.objects
+            .select_for_update()
+            .filter(id__in=[order.id for order in orders])
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+        candidates = [candidate for candidate in candidates if candidate.order.id in order_ids]
+        old_candidates = OrderCandidate.objects.filter(order_id__in=order_ids)
+        old_rows = set(old_candidates.values_list('order_id', 'restaurant_id', 'distance'))
+        new_rows = {(candidate.order.id, candidate.restaurant_id, candidate.distance) for candidate in candidates}
+        changed_order_ids = {order_id for order_id, *_ in old_rows ^ new_rows}
+
+        old_candidates.delete()
+        OrderCandidate.objects.bulk_create(candidates)
+        Order.objects.filter(id__in=changed_order_ids).update(updated_at=timezone.now())
+
+
+def refresh_scheduled_candidates(scheduled):
+    if scheduled.get('all'):
+        refresh_candidates()
+    else:
+        refresh_candidates(reduce(operator.or_, scheduled['orders']))
+
+
+def schedule_candidates_refresh(orders=None):
+    # any number of requests within a transaction end in one refresh
+    def merge(scheduled):
+        if orders is None:
+            scheduled['all'] = True
+        else:
+            scheduled.setdefault('orders', []).append(orders)
+
+    merge_on_commit('refresh_candidates', refresh_scheduled_candidates, merge)
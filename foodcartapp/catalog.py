@@ -0,0 +1,350 @@
+import gzip
+import json
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+import brotli
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Min, Q
+from django.http import HttpResponse
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from .commit_hooks import merge_on_commit
+from .models import Banner, CatalogChange, Product, RestaurantMenuItem
+
+
+PRODUCTS = 'products'
+BANNERS = 'banners'
+
+ENCODINGS = ['br', 'gzip']
+
+
+def get_version(namespace):
+    key = f'catalog:{namespace}:version'
+    version = cache.get(key)
+    if version is None:
+        # start from the clock so a lost key never brings an old version back
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(namespace):
+    key = f'catalog:{namespace}:version'
+    cache.set(f'catalog:{namespace}:modified_at', timezone.now(), timeout=None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        return cache.get(key)
+
+
+def get_last_modified(namespace):
+    key = f'catalog:{namespace}:modified_at'
+    modified_at = cache.get(key)
+    if modified_at is None:
+        cache.add(key, timezone.now(), timeout=None)
+        modified_at = cache.get(key)
+    return modified_at
+
+
+def get_request_payload(request, namespace):
+    # the conditional checks and the response itself share one payload lookup
+    if not hasattr(request, 'catalog_payloads'):
+        request.catalog_payloads = {}
+    if namespace not in request.catalog_payloads:
+        request.catalog_payloads[namespace] = get_payload(namespace)
+    return request.catalog_payloads[namespace]
+
+
+def catalog_condition(namespace):
+    return condition(
+        etag_func=lambda request, *args, **kwargs: (
+            f'{namespace}-{get_request_payload(request, namespace)["version"]}-{get_preferred_encoding(request)}'
+        ),
+        last_modified_func=lambda request, *args, **kwargs: get_request_payload(request, namespace)['modified_at'],
+    )
+
+
+def get_products_restaurants(product_ids):
+    products_restaurants = defaultdict(list)
+    menu_items = (
+        RestaurantMenuItem.objects
+        .filter(availability=True, product__in=product_ids)
+        .order_by('restaurant__name')
+        .values_list('product_id', 'restaurant_id', 'restaurant__name')
+    )
+    for product_id, restaurant_id, restaurant_name in menu_items:
+        products_restaurants[product_id].append({
+            'id': restaurant_id,
+            'name': restaurant_name,
+        })
+    return products_restaurants
+
+
+PRODUCT_FIELDS = {
+    'id': ['id'],
+    'name': ['name'],
+    'price': ['price'],
+    'special_status': ['special_status'],
+    'description': ['description'],
+    'category': ['category__id', 'category__name'],
+    'image': ['image', 'image_variants'],
+    'image_srcset': ['image', 'image_variants'],
+    'image_placeholder': ['image', 'image_variants'],
+    'restaurants': [],
+}
+
+
+def serialize_product(product, restaurants, fields=PRODUCT_FIELDS):
+    serializers = {
+        'id': lambda: product.id,
+        'name': lambda: product.name,
+        'price': lambda: product.price,
+        'special_status': lambda: product.special_status,
+        'description': lambda: product.description,
+        'category': lambda: {
+            'id': product.category.id,
+            'name': product.category.name,
+        },
+        'image': lambda: product.get_image_url('medium'),
+        'image_srcset': lambda: product.get_image_srcset(),
+        'image_placeholder': lambda: product.get_image_placeholder(),
+        'restaurants': lambda: restaurants,
+    }
+    return {field: serialize() for field, serialize in serializers.items() if field in fields}
+
+
+def serialize_products():
+    products = Product.objects.select_related('category').available()
+    return serialize_product_list(products)
+
+
+def serialize_product_list(products, fields=PRODUCT_FIELDS):
+    products = list(products)
+    products_restaurants = {}
+    if 'restaurants' in fields:
+        products_restaurants = get_products_restaurants([product.id for product in products])
+    return [
+        serialize_product(product, products_restaurants.get(product.id, []), fields)
+        for product in products
+    ]
+
+
+def get_products_page(category=None, cursor=None, limit=None, fields=None):
+    fields = fields or PRODUCT_FIELDS
+    columns = ['id', *(column for field in fields for column in PRODUCT_FIELDS[field])]
+    products = Product.objects.available().order_by('id').only(*columns)
+    if 'category' in fields:
+        products = products.select_related('category')
+    if category:
+        products = products.filter(category=category)
+    if cursor:
+        products = products.filter(id__gt=cursor)
+    if limit:
+        products = products[:limit + 1]
+
+    products = list(products)
+    next_cursor = None
+    if limit and len(products) > limit:
+        products = products[:limit]
+        next_cursor = products[-1].id
+    return serialize_product_list(products, fields), next_cursor
+
+
+def to_columnar(products, fields=PRODUCT_FIELDS):
+    """Turn a product list into one array per field.
+
+    Categories and restaurants are listed once and referenced by index.
+    """
+    categories = {}
+    restaurants = {}
+
+    def index_of(dictionary, item):
+        return dictionary.setdefault(item['id'], (len(dictionary), item))[0]
+
+    columns = {field: [] for field in fields}
+    for product in products:
+        for field in fields:
+            value = product[field]
+            if field == 'category':
+                value = index_of(categories, value)
+            elif field == 'restaurants':
+                value = [index_of(restaurants, restaurant) for restaurant in value]
+            columns[field].append(value)
+    return {
+        'products': columns,
+        'categories': [category for _, category in categories.values()],
+        'restaurants': [restaurant for _, restaurant in restaurants.values()],
+    }
+
+
+def serialize_banners():
+    return [
+        {
+            'title': banner.title,
+            'src': banner.image.url,
+            'text': banner.text,
+        }
+        for banner in Banner.objects.active()
+    ]
+
+
+def get_next_banners_change():
+    now = timezone.now()
+    boundaries = Banner.objects.aggregate(
+        next_start=Min('active_from', filter=Q(active_from__gt=now)),
+        next_end=Min('active_until', filter=Q(active_until__gt=now)),
+    )
+    return min(filter(None, boundaries.values()), default=None)
+
+
+SERIALIZERS = {
+    PRODUCTS: serialize_products,
+    BANNERS: serialize_banners,
+}
+
+# payloads whose content changes with time rather than with writes
+EXPIRATIONS = {
+    BANNERS: get_next_banners_change,
+}
+
+# the last payload each worker has served, so a warm worker only reads the version
+local_payloads = {}
+
+EXPIRED_VERSION_TIMEOUT = 60 * 60
+
+
+def build_payload(namespace, version):
+    get_expiration = EXPIRATIONS.get(namespace)
+    expires_at = get_expiration and get_expiration()
+    content = json.dumps(
+        SERIALIZERS[namespace](),
+        cls=DjangoJSONEncoder,
+        ensure_ascii=False,
+        separators=(',', ':'),
+    ).encode()
+    payload = {
+        'version': version,
+        'modified_at': get_last_modified(namespace),
+        'expires_at': expires_at,
+        'br': brotli.compress(content),
+        'gzip': gzip.compress(content, compresslevel=9, mtime=0),
+        'identity': content,
+    }
+    return payload
+
+
+def compile_payload(namespace, version):
+    payload = build_payload(namespace, version)
+    cache.set(f'catalog:{namespace}:payload:{version}', payload, timeout=None)
+    return payload
+
+
+def get_payload(namespace):
+    version = get_version(namespace)
+    payload = local_payloads.get(namespace)
+    if not payload or payload['version'] != version:
+        payload = cache.get(f'catalog:{namespace}:payload:{version}') or compile_payload(namespace, version)
+        local_payloads[namespace] = payload
+
+    if payload['expires_at'] and payload['expires_at'] <= timezone.now():
+        # only the first worker to notice bumps the version, the others
+        # rebuild the payload for themselves until the new version is out
+        if cache.add(f'catalog:{namespace}:expired:{version}', True, timeout=EXPIRED_VERSION_TIMEOUT):
+            publish(namespace)
+            return get_payload(namespace)
+        payload = build_payload(namespace, version)
+        local_payloads[namespace] = payload
+    return payload
+
+
+def publish(namespace):
+    compile_payload(namespace, bump_version(namespace))
+
+
+def schedule_publish(namespace):
+    # many changes saved together, e.g. a restaurant with its menu inline,
+    # are published once after their transaction commits
+    merge_on_commit(f'publish:{namespace}', lambda scheduled: publish(namespace))
+
+
+def get_preferred_encoding(request):
+    accepted = {}
+    for coding in request.headers.get('Accept-Encoding', '').split(','):
+        name, _, params = coding.partition(';')
+        params = params.strip()
+        try:
+            quality = float(params[2:]) if params.startswith('q=') else 1
+        except ValueError:
+            quality = 0
+        accepted[name.strip().lower()] = quality
+    return next((encoding for encoding in ENCODINGS if accepted.get(encoding, 0) > 0), 'identity')
+
+
+def catalog_response(request, namespace):
+    encoding = get_preferred_encoding(request)
+    response = HttpResponse(get_request_payload(request, namespace)[encoding], content_type='application/json')
+    if encoding != 'identity':
+        response['Content-Encoding'] = encoding
+    return response
+
+
+def log_product_changes(product_ids):
+    CatalogChange.objects.bulk_create(
+        [CatalogChange(product_id=product_id) for product_id in set(product_ids)]
+    )
+
+
+def get_product_changes(since):
+    # Ids are taken before commit, so a change may still appear below the
+    # newest id. The version only covers changes made long enough ago for
+    # their transactions to have finished, the rest is sent next time.
+    settled_at = timezone.now() - timedelta(seconds=settings.CHANGES_FEED_LAG)
+    version = (
+        CatalogChange.objects
+        .filter(changed_at__lte=settled_at)
+        .order_by('-id')
+        .values_list('id', flat=True)
+        .first()
+    ) or 0
+    products = Product.objects.select_related('category').available()
+    oldest_id = CatalogChange.objects.order_by('id').values_list('id', flat=True).first()
+    # a client that missed pruned changes, or is ahead of this database,
+    # has to replace its copy with the whole catalog
+    if since is None or since > version or (oldest_id is not None and since < oldest_id - 1):
+        return {
+            'version': version,
+            'full': True,
+            'upserts': serialize_product_list(products),
+            'removals': [],
+        }
+
+    changed_product_ids = set(
+        CatalogChange.objects
+        .filter(id__gt=since, id__lte=version)
+        .values_list('product_id', flat=True)
+    )
+    upserts = serialize_product_list(products.filter(pk__in=changed_product_ids))
+    return {
+        'version': version,
+        'full': False,
+        'upserts': upserts,
+        'removals': sorted(changed_product_ids.difference(product['id'] for product in upserts)),
+    }
+
+
+def prune_product_changes():
+    # the newest change is kept, it carries the current catalog version
+    newest_id = CatalogChange.objects.order_by('-id').values_list('id', flat=True).first()
+    deleted, _ = (
+        CatalogChange.objects
+        .filter(changed_at__lt=timezone.now() - timedelta(seconds=settings.CATALOG_CHANGES_RETENTION))
+        .exclude(id=newest_id)
+        .delete()
+    )
+    return deleted
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+PROCESS_LOCAL_CACHES = [
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+]
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    # catalog versions and rate limits are kept in the cache, so every
+    # gunicorn worker and management command has to see the same one
+    if settings.DEBUG or settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES:
+        return []
+    return [
+        Error(
+            'Кэш по умолчанию не общий для процессов: воркеры будут отдавать устаревший каталог',
+            hint='Укажите в CACHE_URL общий кэш, например memcached или redis',
+            id='foodcartapp.E001',
+        )
+    ]
@@ -0,0 +1,31 @@
+from django.db import transaction
+
+
+def merge_on_commit(key, callback, merge=None):
+    # Requests with the same key made within one transaction share a single
+    # on_commit hook: `merge` folds each request into a shared dict and
+    # `callback` gets that dict once, after the commit. Outside a
+    # transaction the callback runs right away, as on_commit does.
+    connection = transaction.get_connection()
+    if not hasattr(connection, 'merged_on_commit'):
+        connection.merged_on_commit = {}
+    pending = connection.merged_on_commit
+
+    registered_hooks = [hook for _, hook, *_ in connection.run_on_commit]
+    if key in pending and pending[key][1] in registered_hooks:
+        if merge:
+            merge(pending[key][0])
+        return
+
+    # a hook dropped by a rollback is replaced with a new one
+    state = {}
+    if merge:
+        merge(state)
+
+    def hook():
+        if pending.get(key, (None, None))[1] is hook:
+            del pending[key]
+        callback(state)
+
+    pending[key] = (state, hook)
+    transaction.on_commit(hook)
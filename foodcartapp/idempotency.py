@@ -0,0 +1,97 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+POLL_INTERVAL = 0.1
+
+
+def claim_key(key, request_hash):
+    # returns None when the key is ours to process, otherwise the stored
+    # record of the request that claimed it first
+    while True:
+        now = timezone.now()
+        IdempotencyKey.objects.filter(key=key, expires_at__lte=now).delete()
+        try:
+            with transaction.atomic():
+                IdempotencyKey.objects.create(
+                    key=key,
+                    request_hash=request_hash,
+                    expires_at=now + timezone.timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT)
+                )
+            return None
+        except IntegrityError:
+            pass
+
+        record = IdempotencyKey.objects.filter(key=key).first()
+        if record is None:
+            continue
+        if record.is_completed or record.request_hash != request_hash:
+            return record
+        if record.expires_at > timezone.now():
+            time.sleep(POLL_INTERVAL)
+
+
+def replay_response(record):
+    response = HttpResponse(
+        bytes(record.response_body),
+        status=record.response_status,
+        content_type=record.response_content_type
+    )
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            return view(request, *args, **kwargs)
+        if not key or len(key) > IdempotencyKey._meta.get_field('key').max_length:
+            return JsonResponse(
+                {'error': f'Некорректный заголовок {IDEMPOTENCY_HEADER}'},
+                status=400,
+                json_dumps_params={'ensure_ascii': False}
+            )
+
+        request_hash = hashlib.sha256(request.body).hexdigest()
+        record = claim_key(key, request_hash)
+        if record is not None:
+            if record.request_hash != request_hash:
+                return JsonResponse(
+                    {'error': f'{IDEMPOTENCY_HEADER} уже использован с другим запросом'},
+                    status=422,
+                    json_dumps_params={'ensure_ascii': False}
+                )
+            return replay_response(record)
+
+        try:
+            with transaction.atomic():
+                response = view(request, *args, **kwargs)
+                if hasattr(response, 'render'):
+                    response.render()
+                if response.status_code < 400:
+                    # stored in the same transaction as the work itself, so a
+                    # retry never sees an order without its response
+                    IdempotencyKey.objects.filter(key=key).update(
+                        response_status=response.status_code,
+                        response_content_type=response.get('Content-Type', ''),
+                        response_body=response.content,
+                        expires_at=timezone.now() + timezone.timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+                    )
+        except BaseException:
+            IdempotencyKey.objects.filter(key=key, response_status__isnull=True).delete()
+            raise
+        if response.status_code >= 400:
+            # nothing was created, let the client fix the request and retry
+            IdempotencyKey.objects.filter(key=key, response_status__isnull=True).delete()
+        return response
+    return wrapper
@@ -0,0 +1,72 @@
+import base64
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageFilter, ImageOps
+
+
+IMAGE_VARIANTS = {
+    'small': 100,
+    'medium': 400,
+    'large': 800,
+}
+PLACEHOLDER_SIZE = 16
+
+
+def encode_jpeg(image, quality):
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def make_image_variants(image_field):
+    with image_field.open('rb'):
+        image = Image.open(image_field)
+        image = ImageOps.exif_transpose(image).convert('RGB')
+
+    name, _ = os.path.splitext(image_field.name)
+    variants = {}
+    for variant, size in IMAGE_VARIANTS.items():
+        thumbnail = image.copy()
+        thumbnail.thumbnail((size, size), Image.LANCZOS)
+        path = default_storage.save(
+            f'thumbnails/{name}_{variant}.jpg',
+            ContentFile(encode_jpeg(thumbnail, quality=80))
+        )
+        variants[variant] = {
+            'path': path,
+            'width': thumbnail.width,
+        }
+
+    placeholder = image.copy()
+    placeholder.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    placeholder = placeholder.filter(ImageFilter.GaussianBlur(1))
+    placeholder_data = base64.b64encode(encode_jpeg(placeholder, quality=50)).decode()
+
+    return {
+        'source': image_field.name,
+        'variants': variants,
+        'placeholder': f'data:image/jpeg;base64,{placeholder_data}',
+    }
+
+
+def delete_image_variants(image_variants):
+    for variant in image_variants.get('variants', {}).values():
+        default_storage.delete(variant['path'])
+
+
+def get_image_variant_url(image_field, image_variants, variant):
+    if image_variants.get('source') == image_field.name and variant in image_variants.get('variants', {}):
+        return default_storage.url(image_variants['variants'][variant]['path'])
+    return image_field.url
+
+
+def get_image_srcset(image_field, image_variants):
+    if image_variants.get('source') != image_field.name:
+        return ''
+    return ', '.join(
+        f'{default_storage.url(variant["path"])} {variant["width"]}w'
+        for variant in image_variants['variants'].values()
+    )
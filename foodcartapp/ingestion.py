@@ -0,0 +1,78 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .orders import commit_orders
+
+
+class OrderBatcher:
+    # Orders from concurrent requests of one process are written in a shared
+    # transaction, so a burst pays for one commit per batch instead of one
+    # per order. Each caller still waits until its own order is committed.
+
+    def __init__(self, max_delay, max_batch_size):
+        self.max_delay = max_delay
+        self.max_batch_size = max_batch_size
+        self.pending = queue.Queue()
+        self.lock = threading.Lock()
+        self.flusher = None
+
+    def submit(self, order_data):
+        future = Future()
+        self.pending.put((order_data, future))
+        self.ensure_flusher()
+        return future
+
+    def ensure_flusher(self):
+        with self.lock:
+            if self.flusher is None or not self.flusher.is_alive():
+                self.flusher = threading.Thread(target=self.run, name='order-batcher', daemon=True)
+                self.flusher.start()
+
+    def collect_batch(self):
+        batch = [self.pending.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.pending.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        while True:
+            batch = self.collect_batch()
+            close_old_connections()
+            self.flush(batch)
+
+    def flush(self, batch):
+        try:
+            orders = commit_orders([order_data for order_data, _ in batch])
+        except Exception as error:
+            # the batch rolled back, so one bad order must not fail its
+            # neighbours: retry them one by one
+            if len(batch) > 1:
+                for item in batch:
+                    self.flush([item])
+            else:
+                batch[0][1].set_exception(error)
+            return
+        for (_, future), order in zip(batch, orders):
+            future.set_result(order)
+
+
+order_batcher = OrderBatcher(
+    max_delay=settings.ORDER_GROUP_COMMIT_DELAY / 1000,
+    max_batch_size=settings.ORDER_GROUP_COMMIT_BATCH_SIZE,
+)
+
+
+def submit_order(order_data):
+    return order_batcher.submit(order_data).result()
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from foodcartapp.catalog import PRODUCTS, log_product_changes, publish
+from foodcartapp.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Создаёт уменьшенные копии картинок товаров'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='пересоздать копии даже для обработанных картинок')
+
+    def handle(self, *args, **options):
+        updated_product_ids = [
+            product.id for product in Product.objects.exclude(image='')
+            if product.refresh_image_variants(force=options['force'])
+        ]
+        if updated_product_ids:
+            log_product_changes(updated_product_ids)
+            publish(PRODUCTS)
+        self.stdout.write(f'Обработано товаров: {len(updated_product_ids)}')
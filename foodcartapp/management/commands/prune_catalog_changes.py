@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from foodcartapp.catalog import prune_product_changes
+
+
+class Command(BaseCommand):
+    help = 'Удаляет из журнала изменений каталога записи старше CATALOG_CHANGES_RETENTION'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Удалено записей: {prune_product_changes()}')
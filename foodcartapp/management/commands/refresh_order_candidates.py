@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from foodcartapp.candidates import refresh_candidates
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает подходящие рестораны для всех необработанных заказов'
+
+    def handle(self, *args, **options):
+        refresh_candidates()
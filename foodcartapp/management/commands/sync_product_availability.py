@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+
+from foodcartapp.catalog import PRODUCTS, log_product_changes, publish
+from foodcartapp.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает, в скольких ресторанах продаётся каждый товар'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='только проверить, ничего не исправляя')
+
+    def handle(self, *args, **options):
+        mismatched = (
+            Product.objects
+            .with_actual_restaurant_count()
+            .exclude(available_restaurant_count=F('actual_restaurant_count'))
+        )
+        for product in mismatched:
+            self.stdout.write(
+                f'{product.name} (id {product.id}): '
+                f'сохранено {product.available_restaurant_count}, на самом деле {product.actual_restaurant_count}'
+            )
+
+        if options['check']:
+            if mismatched:
+                raise CommandError('Счётчики ресторанов расходятся с меню')
+            return
+        mismatched_ids = [product.id for product in mismatched]
+        updated = Product.objects.update_available_restaurant_count()
+        # update() sends no signals, so the catalog is told about the fixes here
+        if mismatched_ids:
+            log_product_changes(mismatched_ids)
+            publish(PRODUCTS)
+        self.stdout.write(f'Пересчитано товаров: {updated}')
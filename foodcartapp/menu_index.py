@@ -0,0 +1,46 @@
+from collections import defaultdict
+
+from .models import RestaurantMenuItem
+
+
+class MenuIndex:
+    """Restaurant menus as bit masks over products for O(1) basket checks."""
+
+    def __init__(self, menu_items):
+        self.product_bits = {}
+        self.restaurant_masks = defaultdict(int)
+        for restaurant_id, product_id in menu_items:
+            bit = self.product_bits.setdefault(product_id, 1 << len(self.product_bits))
+            self.restaurant_masks[restaurant_id] |= bit
+
+    @classmethod
+    def build(cls, product_ids=None):
+        # an index over some products answers for baskets made of them only
+        menu_items = RestaurantMenuItem.objects.filter(availability=True)
+        if product_ids is not None:
+            menu_items = menu_items.filter(product_id__in=product_ids)
+        return cls(menu_items.values_list('restaurant_id', 'product_id'))
+
+    @property
+    def restaurant_ids(self):
+        return list(self.restaurant_masks.keys())
+
+    def get_basket_mask(self, product_ids):
+        mask = 0
+        for product_id in product_ids:
+            if product_id not in self.product_bits:
+                return None
+            mask |= self.product_bits[product_id]
+        return mask
+
+    def can_cook(self, restaurant_id, basket_mask):
+        if basket_mask is None:
+            return False
+        return self.restaurant_masks.get(restaurant_id, 0) & basket_mask == basket_mask
+
+    def get_restaurants_for(self, product_ids):
+        basket_mask = self.get_basket_mask(product_ids)
+        return [
+            restaurant_id for restaurant_id in self.restaurant_masks
+            if self.can_cook(restaurant_id, basket_mask)
+        ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2 on 2026-10-18 05:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0043_ordercandidate'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['processing_status', '-created_at', '-id'], name='foodcartapp_process_9f33df_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.2 on 2026-10-18 05:41
+
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.db import migrations
+
+
+BANNERS = [
+    ('Burger', 'burger.jpg', 'Tasty Burger at your door step'),
+    ('Spices', 'food.jpg', 'All Cuisines'),
+    ('New York', 'tasty.jpg', 'Food is incomplete without a tasty dessert'),
+]
+
+
+def create_banners(apps, schema_editor):
+    Banner = apps.get_model('foodcartapp', 'Banner')
+    for order, (title, image_name, text) in enumerate(BANNERS):
+        image_path = os.path.join(settings.BASE_DIR, 'assets', image_name)
+        if not os.path.exists(image_path):
+            continue
+        banner = Banner(title=title, text=text, order=order)
+        with open(image_path, 'rb') as image:
+            banner.image.save(image_name, File(image), save=False)
+        banner.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0048_banner'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_banners, migrations.RunPython.noop),
+    ]
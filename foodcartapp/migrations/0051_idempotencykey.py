@@ -0,0 +1,31 @@
+# Generated by Django 3.2 on 2026-10-18 05:42
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0050_product_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True, verbose_name='ключ')),
+                ('request_hash', models.CharField(max_length=64, verbose_name='хэш запроса')),
+                ('response_status', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='код ответа')),
+                ('response_content_type', models.CharField(blank=True, max_length=100, verbose_name='тип ответа')),
+                ('response_body', models.BinaryField(blank=True, null=True, verbose_name='тело ответа')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='создан')),
+                ('expires_at', models.DateTimeField(db_index=True, help_text='Пока ответа нет — время, после которого запрос считается брошенным', verbose_name='действует до')),
+            ],
+            options={
+                'verbose_name': 'ключ идемпотентности',
+                'verbose_name_plural': 'ключи идемпотентности',
+            },
+        ),
+    ]
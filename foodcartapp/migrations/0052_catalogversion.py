@@ -0,0 +1,26 @@
+# Generated by Django 3.2 on 2026-10-18 05:54
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0051_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('namespace', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='раздел каталога')),
+                ('version', models.PositiveBigIntegerField(verbose_name='версия')),
+                ('modified_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='время изменения')),
+            ],
+            options={
+                'verbose_name': 'версия каталога',
+                'verbose_name_plural': 'версии каталога',
+            },
+        ),
+    ]
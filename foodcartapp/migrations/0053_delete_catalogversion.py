@@ -0,0 +1,16 @@
+# Generated by Django 3.2 on 2026-10-18 06:07
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0052_catalogversion'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='CatalogVersion',
+        ),
+    ]
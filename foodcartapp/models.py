@@ -1,9 +1,14 @@
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
-from django.db.models import DecimalField, F, Sum
+from django.db import models, transaction
+from django.db.models import Count, DecimalField, Exists, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from phonenumber_field.modelfields import PhoneNumberField
 
+from places.models import Place
+
+from .images import delete_image_variants, get_image_srcset, get_image_variant_url, make_image_variants
+
 
 class Restaurant(models.Model):
     name = models.CharField(
@@ -31,12 +36,28 @@ class Restaurant(models.Model):
 
 class ProductQuerySet(models.QuerySet):
     def available(self):
-        products = (
-            RestaurantMenuItem.objects
-            .filter(availability=True)
-            .values_list('product')
-        )
-        return self.filter(pk__in=products)
+        return self.filter(available_restaurant_count__gt=0)
+
+    def with_actual_restaurant_count(self):
+        return self.annotate(actual_restaurant_count=get_available_restaurant_count())
+
+    @transaction.atomic
+    def update_available_restaurant_count(self):
+        # lock the rows first so concurrent menu changes recount one after another
+        list(self.select_for_update().values_list('pk', flat=True))
+        return self.update(available_restaurant_count=get_available_restaurant_count())
+
+
+def get_available_restaurant_count():
+    restaurant_count = (
+        RestaurantMenuItem.objects
+        .filter(product=OuterRef('pk'), availability=True)
+        .order_by()
+        .values('product')
+        .annotate(count=Count('pk'))
+        .values('count')
+    )
+    return Coalesce(Subquery(restaurant_count), 0)
 
 
 class ProductCategory(models.Model):
@@ -85,6 +106,18 @@ class Product(models.Model):
         max_length=200,
         blank=True,
     )
+    available_restaurant_count = models.PositiveIntegerField(
+        'в продаже в ресторанах',
+        default=0,
+        db_index=True,
+        editable=False,
+    )
+    image_variants = models.JSONField(
+        'уменьшенные копии картинки',
+        default=dict,
+        blank=True,
+        editable=False,
+    )
 
     objects = ProductQuerySet.as_manager()
 
@@ -95,6 +128,34 @@ class Product(models.Model):
     def __str__(self):
         return self.name
 
+    def get_image_url(self, variant):
+        return get_image_variant_url(self.image, self.image_variants, variant)
+
+    def get_image_srcset(self):
+        return get_image_srcset(self.image, self.image_variants)
+
+    def get_image_placeholder(self):
+        if self.image_variants.get('source') != self.image.name:
+            return None
+        return self.image_variants['placeholder']
+
+    def refresh_image_variants(self, force=False):
+        if not self.image:
+            return False
+        if not force and self.image_variants.get('source') == self.image.name:
+            return False
+        try:
+            image_variants = make_image_variants(self.image)
+        except OSError:
+            return False
+
+        # the old files are still referenced if the caller's transaction rolls back
+        old_image_variants = self.image_variants
+        transaction.on_commit(lambda: delete_image_variants(old_image_variants))
+        self.image_variants = image_variants
+        Product.objects.filter(pk=self.pk).update(image_variants=image_variants)
+        return True
+
 
 class RestaurantMenuItem(models.Model):
     restaurant = models.ForeignKey(
@@ -125,6 +186,97 @@ class RestaurantMenuItem(models.Model):
     def __str__(self):
         return f"{self.restaurant.name} - {self.product.name}"
 
+    # the product stored in the database; the admin inline may move a menu
+    # item to another product, and then both products are affected
+    saved_product_id = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        menu_item = super().from_db(db, field_names, values)
+        if 'product_id' in menu_item.__dict__:
+            menu_item.saved_product_id = menu_item.product_id
+        return menu_item
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.saved_product_id = self.product_id
+
+    @property
+    def affected_product_ids(self):
+        return {self.product_id, self.saved_product_id} - {None}
+
+
+class BannerQuerySet(models.QuerySet):
+    def active(self, moment=None):
+        moment = moment or timezone.now()
+        return self.filter(
+            Q(active_from__isnull=True) | Q(active_from__lte=moment),
+            Q(active_until__isnull=True) | Q(active_until__gt=moment),
+        )
+
+
+class Banner(models.Model):
+    title = models.CharField(
+        'заголовок',
+        max_length=50
+    )
+    text = models.CharField(
+        'текст',
+        max_length=200,
+        blank=True,
+    )
+    image = models.ImageField(
+        'картинка'
+    )
+    order = models.PositiveIntegerField(
+        'порядок',
+        default=0,
+        db_index=True,
+    )
+    active_from = models.DateTimeField(
+        'показывать с',
+        null=True,
+        blank=True,
+        db_index=True,
+    )
+    active_until = models.DateTimeField(
+        'показывать до',
+        null=True,
+        blank=True,
+        db_index=True,
+    )
+
+    objects = BannerQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'баннер'
+        verbose_name_plural = 'баннеры'
+        ordering = ['order', 'id']
+
+    def __str__(self):
+        return self.title
+
+
+class CatalogChange(models.Model):
+    id = models.BigAutoField(
+        primary_key=True,
+        verbose_name='версия каталога'
+    )
+    product_id = models.PositiveIntegerField(
+        verbose_name='id товара'
+    )
+    changed_at = models.DateTimeField(
+        verbose_name='время изменения',
+        auto_now_add=True
+    )
+
+    class Meta:
+        verbose_name = 'изменение каталога'
+        verbose_name_plural = 'изменения каталога'
+
+    def __str__(self):
+        return f"{self.id} - {self.product_id}"
+
 
 class OrderQuerySet(models.QuerySet):
     def get_order_price(self):
@@ -135,6 +287,14 @@ class OrderQuerySet(models.QuerySet):
             )
         )
 
+    def with_coordinates(self):
+        places = Place.objects.filter(address=OuterRef('address'))
+        return self.annotate(
+            lon=Subquery(places.values('lon')),
+            lat=Subquery(places.values('lat')),
+            is_geocoded=Exists(places)
+        )
+
 
 class Order(models.Model):
     order_statuses = (
@@ -198,6 +358,11 @@ class Order(models.Model):
         blank=True,
         db_index=True
     )
+    updated_at = models.DateTimeField(
+        verbose_name='время последнего изменения',
+        auto_now=True,
+        db_index=True
+    )
     restaurant = models.ForeignKey(
         Restaurant,
         on_delete=models.SET_NULL,
@@ -212,6 +377,9 @@ class Order(models.Model):
     class Meta:
         verbose_name = 'заказ'
         verbose_name_plural = 'заказы'
+        indexes = [
+            models.Index(fields=['processing_status', '-created_at', '-id']),
+        ]
 
     def __str__(self):
         return f"{self.firstname} {self.lastname} {self.address}"
@@ -254,3 +422,79 @@ class OrderItem(models.Model):
 
     def __str__(self):
         return self.product.name
+
+
+class OrderCandidate(models.Model):
+    order = models.ForeignKey(
+        Order,
+        related_name='candidates',
+        verbose_name='заказ',
+        on_delete=models.CASCADE,
+    )
+    restaurant = models.ForeignKey(
+        Restaurant,
+        related_name='order_candidates',
+        verbose_name='ресторан',
+        on_delete=models.CASCADE,
+    )
+    distance = models.FloatField(
+        verbose_name='расстояние, км'
+    )
+
+    class Meta:
+        verbose_name = 'подходящий ресторан'
+        verbose_name_plural = 'подходящие рестораны'
+        unique_together = [
+            ['order', 'restaurant']
+        ]
+        ordering = ['order', 'distance']
+
+    def __str__(self):
+        return f"{self.order_id} - {self.restaurant.name}"
+
+
+class IdempotencyKey(models.Model):
+    key = models.CharField(
+        'ключ',
+        max_length=255,
+        unique=True
+    )
+    request_hash = models.CharField(
+        'хэш запроса',
+        max_length=64
+    )
+    response_status = models.PositiveSmallIntegerField(
+        'код ответа',
+        null=True,
+        blank=True
+    )
+    response_content_type = models.CharField(
+        'тип ответа',
+        max_length=100,
+        blank=True
+    )
+    response_body = models.BinaryField(
+        'тело ответа',
+        null=True,
+        blank=True
+    )
+    created_at = models.DateTimeField(
+        'создан',
+        default=timezone.now
+    )
+    expires_at = models.DateTimeField(
+        'действует до',
+        db_index=True,
+        help_text='Пока ответа нет — время, после которого запрос считается брошенным'
+    )
+
+    class Meta:
+        verbose_name = 'ключ идемпотентности'
+        verbose_name_plural = 'ключи идемпотентности'
+
+    def __str__(self):
+        return self.key
+
+    @property
+    def is_completed(self):
+        return self.response_status is not None
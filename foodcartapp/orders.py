@@ -0,0 +1,54 @@
+import rollbar
+from django.db import connection, transaction
+
+from places.geocoding import enqueue_addresses
+
+from .candidates import schedule_candidates_refresh
+from .models import Order, OrderItem
+
+
+@transaction.atomic
+def create_orders(orders_data):
+    orders = []
+    orders_items = []
+    for order_data in orders_data:
+        order_data = dict(order_data)
+        orders_items.append(order_data.pop('products'))
+        orders.append(Order(**order_data))
+
+    if len(orders) > 1 and connection.features.can_return_rows_from_bulk_insert:
+        # bulk_create skips post_save, so do what the Order receivers would do
+        Order.objects.bulk_create(orders)
+        enqueue_addresses(order.address for order in orders)
+        schedule_candidates_refresh(Order.objects.filter(pk__in=[order.pk for order in orders]))
+    else:
+        for order in orders:
+            order.save()
+
+    OrderItem.objects.bulk_create(
+        OrderItem(
+            order=order,
+            product=item['product'],
+            quantity=item['quantity'],
+            price=item['product'].price,
+        )
+        for order, items in zip(orders, orders_items)
+        for item in items
+    )
+    return orders
+
+
+def commit_orders(orders_data):
+    # Commit is the point of no return. A failing post-commit hook, such as
+    # the candidates refresh, is reported rather than raised, so callers
+    # never retry orders that are already stored.
+    committed = []
+    try:
+        with transaction.atomic():
+            transaction.on_commit(lambda: committed.append(True))
+            orders = create_orders(orders_data)
+    except Exception:
+        if not committed:
+            raise
+        rollbar.report_exc_info()
+    return orders
@@ -0,0 +1,124 @@
+from itertools import chain
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from places.geocoding import enqueue_addresses
+from places.models import GeocodingTask, Place
+from places.signals import geocoding_queue_refill, places_updated
+
+from .candidates import schedule_candidates_refresh
+from .catalog import BANNERS, PRODUCTS, log_product_changes, schedule_publish
+from .images import delete_image_variants
+from .models import Banner, Order, OrderItem, Product, ProductCategory, Restaurant, RestaurantMenuItem
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_save, sender=Restaurant)
+def enqueue_address_geocoding(sender, instance, **kwargs):
+    enqueue_addresses([instance.address])
+
+
+@receiver(geocoding_queue_refill)
+def enqueue_missing_addresses(sender, **kwargs):
+    # orders and restaurants saved before their address could be queued,
+    # e.g. created with bulk_create or before the queue existed
+    is_known = Exists(Place.objects.filter(address=OuterRef('address')))
+    is_queued = Exists(GeocodingTask.objects.filter(address=OuterRef('address')))
+    enqueue_addresses(chain(
+        Order.objects
+        .filter(processing_status='not_processed')
+        .exclude(is_known).exclude(is_queued)
+        .values_list('address', flat=True),
+        Restaurant.objects.exclude(is_known).exclude(is_queued).values_list('address', flat=True),
+    ))
+
+
+@receiver(post_save, sender=Order)
+def refresh_order_candidates(sender, instance, **kwargs):
+    schedule_candidates_refresh(Order.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Restaurant)
+def refresh_all_candidates(sender, **kwargs):
+    schedule_candidates_refresh()
+
+
+@receiver(post_save, sender=RestaurantMenuItem)
+@receiver(post_delete, sender=RestaurantMenuItem)
+def refresh_product_candidates(sender, instance, **kwargs):
+    schedule_candidates_refresh(
+        Order.objects.filter(
+            processing_status='not_processed',
+            id__in=OrderItem.objects.filter(product_id__in=instance.affected_product_ids).values('order_id')
+        )
+    )
+
+
+@receiver(places_updated)
+def refresh_located_candidates(sender, addresses, **kwargs):
+    if Restaurant.objects.filter(address__in=addresses).exists():
+        schedule_candidates_refresh()
+    else:
+        schedule_candidates_refresh(
+            Order.objects.filter(address__in=addresses, processing_status='not_processed')
+        )
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_delete, sender=ProductCategory)
+@receiver(post_save, sender=RestaurantMenuItem)
+@receiver(post_delete, sender=RestaurantMenuItem)
+@receiver(post_save, sender=Restaurant)
+def invalidate_products_catalog(sender, **kwargs):
+    schedule_publish(PRODUCTS)
+
+
+@receiver(post_save, sender=Banner)
+@receiver(post_delete, sender=Banner)
+def invalidate_banners(sender, **kwargs):
+    schedule_publish(BANNERS)
+
+
+@receiver(post_save, sender=Product)
+def make_product_image_variants(sender, instance, **kwargs):
+    if instance.refresh_image_variants():
+        schedule_publish(PRODUCTS)
+
+
+@receiver(post_delete, sender=Product)
+def delete_product_image_variants(sender, instance, **kwargs):
+    transaction.on_commit(lambda: delete_image_variants(instance.image_variants))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def log_product_change(sender, instance, **kwargs):
+    log_product_changes([instance.id])
+
+
+@receiver(post_save, sender=RestaurantMenuItem)
+@receiver(post_delete, sender=RestaurantMenuItem)
+def log_menu_item_change(sender, instance, **kwargs):
+    log_product_changes(instance.affected_product_ids)
+
+
+@receiver(post_save, sender=Restaurant)
+def log_restaurant_change(sender, instance, **kwargs):
+    log_product_changes(instance.menu_items.values_list('product_id', flat=True))
+
+
+@receiver(post_save, sender=ProductCategory)
+@receiver(pre_delete, sender=ProductCategory)
+def log_category_change(sender, instance, **kwargs):
+    log_product_changes(instance.products.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=RestaurantMenuItem)
+@receiver(post_delete, sender=RestaurantMenuItem)
+def update_product_availability(sender, instance, **kwargs):
+    Product.objects.filter(pk__in=instance.affected_product_ids).update_available_restaurant_count()
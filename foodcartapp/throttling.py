@@ -0,0 +1,80 @@
+import json
+import math
+import re
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+
+
+def get_client_ip(request):
+    # Behind reverse proxies REMOTE_ADDR is the nearest proxy. Each trusted
+    # proxy appends the address it got the request from to X-Forwarded-For,
+    # so the client is the entry added by the outermost one; anything to
+    # the left of it may be forged by the client.
+    proxies_count = settings.TRUSTED_PROXIES_COUNT
+    if not proxies_count:
+        return request.META.get('REMOTE_ADDR')
+    forwarded_for = [
+        address.strip() for address in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')
+        if address.strip()
+    ]
+    if len(forwarded_for) < proxies_count:
+        return request.META.get('REMOTE_ADDR')
+    return forwarded_for[-proxies_count]
+
+
+def get_order_phonenumber(request):
+    # only a cheap peek at the body, the serializer validates it later
+    try:
+        phonenumber = json.loads(request.body).get('phonenumber')
+    except (ValueError, AttributeError):
+        return None
+    if not isinstance(phonenumber, str):
+        return None
+    return re.sub(r'[^\d+]', '', phonenumber) or None
+
+
+def take_token(key, rate, burst):
+    # Token bucket refilled with `rate` tokens per second. Returns how many
+    # seconds to wait for the next token, or 0 if the request is admitted.
+    # The cache has no compare-and-set, so concurrent requests may slip a
+    # token or two over the limit, which is fine for admission control.
+    now = time.time()
+    tokens, updated_at = cache.get(key, (burst, now))
+    tokens = min(burst, tokens + (now - updated_at) * rate)
+    if tokens < 1:
+        return (1 - tokens) / rate
+    cache.set(key, (tokens - 1, now), timeout=math.ceil(burst / rate))
+    return 0
+
+
+def rate_limit(setting, key_funcs):
+    # The limit is `<setting>` requests per minute with bursts up to
+    # `<setting>_BURST`, counted separately for every key function.
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            per_minute = getattr(settings, setting)
+            if not per_minute:
+                return view(request, *args, **kwargs)
+            burst = getattr(settings, f'{setting}_BURST')
+
+            for key_func in key_funcs:
+                key = key_func(request)
+                if key is None:
+                    continue
+                wait = take_token(f'rate-limit:{setting}:{key_func.__name__}:{key}', per_minute / 60, burst)
+                if wait:
+                    response = JsonResponse(
+                        {'error': 'Слишком много запросов, повторите позже'},
+                        status=429,
+                        json_dumps_params={'ensure_ascii': False}
+                    )
+                    response['Retry-After'] = math.ceil(wait)
+                    return response
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
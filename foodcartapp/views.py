@@ -1,66 +1,112 @@
-from django.db import transaction
-from django.http import JsonResponse
-from django.templatetags.static import static
+import hmac
+import json
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from django.views.decorators.vary import vary_on_headers
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from rest_framework.serializers import ModelSerializer
+from rest_framework.serializers import (CharField, ChoiceField, Field, IntegerField, ModelSerializer,
+                                        PrimaryKeyRelatedField, Serializer, ValidationError)
 
+from .catalog import (BANNERS, PRODUCT_FIELDS, PRODUCTS, catalog_condition, catalog_response,
+                      get_product_changes, get_products_page, to_columnar)
+from .idempotency import IDEMPOTENCY_HEADER, idempotent
+from .ingestion import submit_order
 from .models import Order, OrderItem, Product
+from .orders import commit_orders
+from .throttling import get_client_ip, get_order_phonenumber, rate_limit
 
 
+@rate_limit('CATALOG_RATE_LIMIT', [get_client_ip])
+@vary_on_headers('Accept-Encoding')
+@cache_control(no_cache=True)
+@catalog_condition(BANNERS)
 def banners_list_api(request):
-    # FIXME move data to db?
-    return JsonResponse([
-        {
-            'title': 'Burger',
-            'src': static('burger.jpg'),
-            'text': 'Tasty Burger at your door step',
-        },
-        {
-            'title': 'Spices',
-            'src': static('food.jpg'),
-            'text': 'All Cuisines',
-        },
-        {
-            'title': 'New York',
-            'src': static('tasty.jpg'),
-            'text': 'Food is incomplete without a tasty dessert',
-        }
-    ], safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
+    return catalog_response(request, BANNERS)
+
+
+class ProductListParamsSerializer(Serializer):
+    category = IntegerField(required=False, min_value=1)
+    cursor = IntegerField(required=False, min_value=0)
+    limit = IntegerField(required=False, min_value=1, max_value=settings.PRODUCTS_PAGE_MAX_SIZE)
+    fields = CharField(required=False)
+    format = ChoiceField(required=False, choices=['objects', 'columnar'])
+
+    def validate_fields(self, value):
+        fields = [field.strip() for field in value.split(',') if field.strip()]
+        unknown_fields = set(fields).difference(PRODUCT_FIELDS)
+        if unknown_fields:
+            raise ValidationError(f'Неизвестные поля: {", ".join(sorted(unknown_fields))}')
+        return fields
 
 
+@rate_limit('CATALOG_RATE_LIMIT', [get_client_ip])
+@vary_on_headers('Accept-Encoding')
+@cache_control(no_cache=True)
+@catalog_condition(PRODUCTS)
 def product_list_api(request):
-    products = Product.objects.select_related('category').available()
-
-    dumped_products = []
-    for product in products:
-        dumped_product = {
-            'id': product.id,
-            'name': product.name,
-            'price': product.price,
-            'special_status': product.special_status,
-            'description': product.description,
-            'category': {
-                'id': product.category.id,
-                'name': product.category.name,
-            },
-            'image': product.image.url,
-            'restaurant': {
-                'id': product.id,
-                'name': product.name,
-            }
-        }
-        dumped_products.append(dumped_product)
-    return JsonResponse(dumped_products, safe=False, json_dumps_params={
+    if not request.GET:
+        return catalog_response(request, PRODUCTS)
+
+    params_serializer = ProductListParamsSerializer(data=request.GET)
+    if not params_serializer.is_valid():
+        return JsonResponse(params_serializer.errors, status=400, json_dumps_params={'ensure_ascii': False})
+
+    params = params_serializer.validated_data
+    response_format = params.pop('format', 'objects')
+    products, next_cursor = get_products_page(**params)
+    if response_format == 'columnar':
+        products = to_columnar(products, params.get('fields') or PRODUCT_FIELDS)
+    response = JsonResponse(products, safe=False, json_dumps_params={
         'ensure_ascii': False,
-        'indent': 4,
+        'separators': (',', ':'),
     })
+    if next_cursor:
+        next_page_params = request.GET.copy()
+        next_page_params['cursor'] = next_cursor
+        response['Link'] = f'<{request.build_absolute_uri("?" + next_page_params.urlencode())}>; rel="next"'
+    return response
+
+
+@rate_limit('CATALOG_RATE_LIMIT', [get_client_ip])
+def product_changes_api(request):
+    since = request.GET.get('since')
+    if since is not None and not (since.isascii() and since.isdigit()):
+        return JsonResponse({'error': 'since должен быть номером версии каталога'}, status=400)
+
+    return JsonResponse(
+        get_product_changes(since and int(since)),
+        json_dumps_params={
+            'ensure_ascii': False,
+            'separators': (',', ':'),
+        }
+    )
+
+
+class ProductIdField(Field):
+    # Only parses the id; OrderSerializer resolves the whole basket at once.
+    # Errors are worded as PrimaryKeyRelatedField's, which it replaces.
+    default_error_messages = PrimaryKeyRelatedField.default_error_messages
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+    def to_representation(self, value):
+        return value.pk
 
 
 class OrderItemSerializer(ModelSerializer):
+    product = ProductIdField()
 
     class Meta:
         model = OrderItem
@@ -74,8 +120,26 @@ class OrderSerializer(ModelSerializer):
         model = Order
         fields = ['firstname', 'lastname', 'phonenumber', 'address', 'products']
 
-
-@transaction.atomic
+    def validate_products(self, items):
+        # the whole basket is checked against one products map, either
+        # preloaded by the caller or fetched here in a single query
+        products = self.context.get('products')
+        if products is None:
+            products = Product.objects.in_bulk({item['product'] for item in items})
+
+        product_field = self.fields['products'].child.fields['product']
+        errors = [
+            {} if item['product'] in products
+            else {'product': [product_field.error_messages['does_not_exist'].format(pk_value=item['product'])]}
+            for item in items
+        ]
+        if any(errors):
+            raise ValidationError(errors)
+        return [{**item, 'product': products[item['product']]} for item in items]
+
+
+@rate_limit('ORDER_RATE_LIMIT', [get_client_ip, get_order_phonenumber])
+@idempotent
 @api_view(['POST'])
 def register_order(request):
 
@@ -83,18 +147,89 @@ def register_order(request):
     serializer = OrderSerializer(data=order_raw)
     serializer.is_valid(raise_exception=True)
 
-    order = Order.objects.create(
-        firstname=serializer.validated_data['firstname'],
-        lastname=serializer.validated_data['lastname'],
-        phonenumber=serializer.validated_data['phonenumber'],
-        address=serializer.validated_data['address']
-    )
-    for product in serializer.validated_data['products']:
-        OrderItem.objects.create(
-            order=order,
-            product=product['product'],
-            quantity=product['quantity'],
-            price=product['product'].price
-        )
+    # An idempotent order has to be committed together with its stored
+    # response, and that transaction is this request's, not the batch's
+    if settings.ORDER_GROUP_COMMIT and IDEMPOTENCY_HEADER not in request.headers:
+        submit_order(serializer.validated_data)
+    else:
+        commit_orders([serializer.validated_data])
 
     return Response(serializer.data)
+
+
+def get_partner_token(request):
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        return None
+    return token
+
+
+def is_partner(request):
+    token = get_partner_token(request)
+    return token is not None and any(
+        hmac.compare_digest(token, partner_token) for partner_token in settings.PARTNER_API_TOKENS
+    )
+
+
+def import_orders(lines):
+    # Orders arrive one JSON object per line and are written in chunks, so
+    # neither the upload nor the report is ever held in memory as a whole.
+    products = Product.objects.in_bulk()
+    chunk = []
+    created_count = invalid_count = error_count = 0
+
+    def flush(chunk):
+        try:
+            orders = commit_orders([order_data for _, order_data in chunk])
+        except DatabaseError:
+            # the chunk rolled back, find the orders that can be saved
+            if len(chunk) > 1:
+                for item in chunk:
+                    yield from flush([item])
+                return
+            yield {'line': chunk[0][0], 'status': 'error'}
+            return
+        for (line_number, _), order in zip(chunk, orders):
+            yield {'line': line_number, 'status': 'created', 'id': order.id}
+
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            order_raw = json.loads(line)
+        except ValueError:
+            invalid_count += 1
+            yield {'line': line_number, 'status': 'invalid', 'errors': {'non_field_errors': ['Некорректный JSON']}}
+            continue
+        serializer = OrderSerializer(data=order_raw, context={'products': products})
+        if not serializer.is_valid():
+            invalid_count += 1
+            yield {'line': line_number, 'status': 'invalid', 'errors': serializer.errors}
+            continue
+
+        chunk.append((line_number, serializer.validated_data))
+        if len(chunk) >= settings.ORDER_IMPORT_CHUNK_SIZE:
+            for result in flush(chunk):
+                created_count += result['status'] == 'created'
+                error_count += result['status'] == 'error'
+                yield result
+            chunk = []
+
+    for result in flush(chunk) if chunk else []:
+        created_count += result['status'] == 'created'
+        error_count += result['status'] == 'error'
+        yield result
+    yield {'created': created_count, 'invalid': invalid_count, 'error': error_count}
+
+
+@csrf_exempt
+@require_POST
+@rate_limit('ORDER_IMPORT_RATE_LIMIT', [get_partner_token])
+def import_orders_api(request):
+    if not is_partner(request):
+        return JsonResponse({'error': 'Неверный токен партнёра'}, status=401, json_dumps_params={'ensure_ascii': False})
+
+    return StreamingHttpResponse(
+        (json.dumps(result, ensure_ascii=False) + '\n' for result in import_orders(request)),
+        content_type='application/x-ndjson'
+    )
@@ -0,0 +1,43 @@
+import numpy as np
+from django.conf import settings
+from geopy import distance
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def to_points(coordinates):
+    return np.asarray(coordinates, dtype=float).reshape(-1, 2)
+
+
+def haversine_matrix(origins, destinations):
+    origins = np.radians(to_points(origins))
+    destinations = np.radians(to_points(destinations))
+    origin_lats, origin_lons = origins[:, 0, np.newaxis], origins[:, 1, np.newaxis]
+    destination_lats, destination_lons = destinations[:, 0], destinations[:, 1]
+
+    a = (
+        np.sin((destination_lats - origin_lats) / 2) ** 2
+        + np.cos(origin_lats) * np.cos(destination_lats) * np.sin((destination_lons - origin_lons) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def geodesic_matrix(origins, destinations):
+    origins, destinations = to_points(origins), to_points(destinations)
+    matrix = np.empty((len(origins), len(destinations)))
+    for row, origin in enumerate(origins):
+        for column, destination in enumerate(destinations):
+            matrix[row, column] = distance.geodesic(origin, destination).km
+    return matrix
+
+
+DISTANCE_MODELS = {
+    'haversine': haversine_matrix,
+    'geodesic': geodesic_matrix,
+}
+
+
+def distance_matrix(origins, destinations):
+    """Distances in km between every (lat, lon) origin and destination."""
+    return DISTANCE_MODELS[settings.DISTANCE_MODEL](origins, destinations)
@@ -0,0 +1,134 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import GeocodingTask, Place
+from .signals import geocoding_queue_refill, places_updated
+
+
+GEOCODER_URL = 'https://geocode-maps.yandex.ru/1.x'
+
+
+class GeocoderError(Exception):
+    pass
+
+
+def fetch_coordinates(apikey, address, session=requests):
+    try:
+        response = session.get(GEOCODER_URL, params={
+            'geocode': address,
+            'apikey': apikey,
+            'format': 'json',
+        }, timeout=settings.GEOCODER_TIMEOUT)
+        response.raise_for_status()
+    except requests.RequestException as error:
+        raise GeocoderError(address) from error
+
+    try:
+        found_places = response.json()['response']['GeoObjectCollection']['featureMember']
+        if not found_places:
+            return None
+        most_relevant = found_places[0]
+        lon, lat = most_relevant['GeoObject']['Point']['pos'].split(" ")
+    except (ValueError, KeyError, IndexError, TypeError, AttributeError) as error:
+        raise GeocoderError(address) from error
+    return lon, lat
+
+
+def fetch_places(addresses, apikey=None, max_workers=None):
+    addresses = list(dict.fromkeys(address for address in addresses if address))
+    if not addresses:
+        return []
+    apikey = apikey or settings.YA_MAPS_API_KEY
+    max_workers = min(max_workers or settings.GEOCODER_MAX_WORKERS, len(addresses))
+
+    def fetch(session, address):
+        try:
+            return address, fetch_coordinates(apikey, address, session)
+        except GeocoderError:
+            return address, False
+
+    with requests.Session() as session:
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max_workers)
+        session.mount('https://', adapter)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(lambda address: fetch(session, address), addresses))
+
+    return save_places(
+        (address, coordinates) for address, coordinates in results
+        # transient geocoder failure, the address will be retried later
+        if coordinates is not False
+    )
+
+
+@transaction.atomic
+def save_places(results):
+    results = dict(results)
+    known_places = Place.objects.in_bulk(results.keys(), field_name='address')
+    updated_at = timezone.now()
+
+    new_places = []
+    for address, coordinates in results.items():
+        lon, lat = coordinates or (None, None)
+        place = known_places.get(address) or Place(address=address)
+        place.lon, place.lat, place.updated_at = lon, lat, updated_at
+        if place.pk is None:
+            new_places.append(place)
+
+    Place.objects.bulk_update(known_places.values(), ['lon', 'lat', 'updated_at'])
+    Place.objects.bulk_create(new_places, ignore_conflicts=True)
+    places_updated.send(sender=Place, addresses=list(results.keys()))
+    return [*known_places.values(), *new_places]
+
+
+def enqueue_addresses(addresses):
+    addresses = set(address for address in addresses if address)
+    if not addresses:
+        return
+    known_addresses = Place.objects.filter(address__in=addresses).values_list('address', flat=True)
+    GeocodingTask.objects.bulk_create(
+        [GeocodingTask(address=address) for address in addresses.difference(known_addresses)],
+        ignore_conflicts=True
+    )
+
+
+def process_geocoding_queue(batch_size):
+    now = timezone.now()
+    tasks = list(GeocodingTask.objects.filter(next_attempt_at__lte=now).order_by('next_attempt_at')[:batch_size])
+    geocoded_addresses = {place.address for place in fetch_places([task.address for task in tasks])}
+
+    failed_tasks = [task for task in tasks if task.address not in geocoded_addresses]
+    for task in failed_tasks:
+        task.attempts += 1
+        task.next_attempt_at = now + timedelta(seconds=settings.GEOCODER_RETRY_DELAY * 2 ** (task.attempts - 1))
+    # an address the geocoder keeps failing on is remembered as not found and
+    # retried with the other not found addresses after the negative cache TTL
+    abandoned_addresses = [
+        task.address for task in failed_tasks if task.attempts >= settings.GEOCODER_MAX_ATTEMPTS
+    ]
+    if abandoned_addresses:
+        save_places((address, None) for address in abandoned_addresses)
+
+    GeocodingTask.objects.filter(address__in=[*geocoded_addresses, *abandoned_addresses]).delete()
+    GeocodingTask.objects.bulk_update(
+        [task for task in failed_tasks if task.address not in abandoned_addresses],
+        ['attempts', 'next_attempt_at']
+    )
+    return len(tasks), len(geocoded_addresses)
+
+
+def enqueue_stale_places():
+    stale_addresses = Place.objects.stale().values_list('address', flat=True)
+    GeocodingTask.objects.bulk_create(
+        [GeocodingTask(address=address) for address in stale_addresses],
+        ignore_conflicts=True
+    )
+
+
+def refill_geocoding_queue():
+    enqueue_stale_places()
+    geocoding_queue_refill.send(sender=GeocodingTask)
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from places.geocoding import process_geocoding_queue, refill_geocoding_queue
+
+
+class Command(BaseCommand):
+    help = 'Геокодирует адреса из очереди и сохраняет координаты'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='разобрать очередь один раз и выйти')
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--interval', type=float, default=5, help='пауза в секундах, когда очередь пуста')
+
+    def handle(self, *args, **options):
+        while True:
+            refill_geocoding_queue()
+            queued, geocoded = process_geocoding_queue(options['batch_size'])
+            if queued:
+                self.stdout.write(f'Геокодировано адресов: {geocoded} из {queued}')
+            if options['once'] and (queued < options['batch_size'] or not geocoded):
+                return
+            if not geocoded:
+                time.sleep(options['interval'])
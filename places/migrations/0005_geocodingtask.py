@@ -0,0 +1,25 @@
+# Generated by Django 3.2 on 2026-10-18 05:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0004_auto_20211028_1349'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocodingTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('address', models.CharField(max_length=100, unique=True, verbose_name='адрес')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='дата постановки в очередь')),
+            ],
+            options={
+                'verbose_name': 'адрес в очереди на геокодирование',
+                'verbose_name_plural': 'адреса в очереди на геокодирование',
+            },
+        ),
+    ]
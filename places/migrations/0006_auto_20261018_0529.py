@@ -0,0 +1,22 @@
+# Generated by Django 3.2 on 2026-10-18 05:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0005_geocodingtask'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='place',
+            options={'verbose_name': 'место', 'verbose_name_plural': 'места'},
+        ),
+        migrations.AlterField(
+            model_name='place',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='дата получения координат'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2 on 2026-10-18 06:05
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('places', '0006_auto_20261018_0529'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='geocodingtask',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='неудачных попыток'),
+        ),
+        migrations.AddField(
+            model_name='geocodingtask',
+            name='next_attempt_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='время следующей попытки'),
+        ),
+    ]
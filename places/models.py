@@ -1,4 +1,20 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class PlaceQuerySet(models.QuerySet):
+    def stale(self):
+        now = timezone.now()
+        found_expired = Q(lat__isnull=False, updated_at__lt=now - timedelta(seconds=settings.GEOCODER_CACHE_TTL))
+        not_found_expired = Q(
+            lat__isnull=True,
+            updated_at__lt=now - timedelta(seconds=settings.GEOCODER_NEGATIVE_CACHE_TTL)
+        )
+        return self.filter(found_expired | not_found_expired)
 
 
 class Place(models.Model):
@@ -21,5 +37,44 @@ class Place(models.Model):
         )
     updated_at = models.DateTimeField(
         verbose_name='дата получения координат',
-        auto_now=True
+        auto_now=True,
+        db_index=True
     )
+
+    objects = PlaceQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'место'
+        verbose_name_plural = 'места'
+
+    def __str__(self):
+        return self.address
+
+
+class GeocodingTask(models.Model):
+    address = models.CharField(
+        'адрес',
+        max_length=100,
+        unique=True
+    )
+    created_at = models.DateTimeField(
+        verbose_name='дата постановки в очередь',
+        auto_now_add=True,
+        db_index=True
+    )
+    attempts = models.PositiveSmallIntegerField(
+        'неудачных попыток',
+        default=0
+    )
+    next_attempt_at = models.DateTimeField(
+        'время следующей попытки',
+        default=timezone.now,
+        db_index=True
+    )
+
+    class Meta:
+        verbose_name = 'адрес в очереди на геокодирование'
+        verbose_name_plural = 'адреса в очереди на геокодирование'
+
+    def __str__(self):
+        return self.address
@@ -0,0 +1,9 @@
+from django.dispatch import Signal
+
+
+# sent with the list of addresses whose coordinates were (re)written
+places_updated = Signal()
+
+# sent by the geocoding worker before each pass, so that apps can queue
+# their addresses that have no place yet
+geocoding_queue_refill = Signal()
@@ -0,0 +1,62 @@
+import math
+from collections import defaultdict
+
+import numpy as np
+
+from .distances import distance_matrix
+
+
+KM_PER_DEGREE = 111.2
+
+
+class SpatialIndex:
+    """Uniform lat/lon grid with cells not smaller than the search radius.
+
+    Every point within the radius of a query lies in the query cell or in
+    one of its eight neighbours, so a lookup only measures those points.
+    """
+
+    def __init__(self, keys, coordinates, radius_km=None):
+        self.keys = list(keys)
+        self.coordinates = np.asarray(coordinates, dtype=float).reshape(-1, 2)
+        self.radius_km = radius_km
+        self.cells = defaultdict(list)
+        if not radius_km or not self.keys:
+            return
+
+        self.lat_step = radius_km / KM_PER_DEGREE
+        max_lat = min(np.abs(self.coordinates[:, 0]).max() + self.lat_step, 89)
+        self.lon_step = radius_km / (KM_PER_DEGREE * math.cos(math.radians(max_lat)))
+        for position, (lat, lon) in enumerate(self.coordinates):
+            self.cells[self.get_cell(lat, lon)].append(position)
+
+    def get_cell(self, lat, lon):
+        return math.floor(lat / self.lat_step), math.floor(lon / self.lon_step)
+
+    def get_nearby_positions(self, lat, lon):
+        if not self.cells:
+            return range(len(self.keys))
+        cell_lat, cell_lon = self.get_cell(lat, lon)
+        return [
+            position
+            for lat_shift in (-1, 0, 1)
+            for lon_shift in (-1, 0, 1)
+            for position in self.cells.get((cell_lat + lat_shift, cell_lon + lon_shift), [])
+        ]
+
+    def nearest(self, lat, lon, limit=None, keys=None):
+        lat, lon = float(lat), float(lon)
+        positions = [
+            position for position in self.get_nearby_positions(lat, lon)
+            if keys is None or self.keys[position] in keys
+        ]
+        if not positions:
+            return []
+        distances = distance_matrix([(lat, lon)], self.coordinates[positions])[0]
+        found = [
+            (distance, self.keys[position])
+            for distance, position in zip(distances, positions)
+            if not self.radius_km or distance <= self.radius_km
+        ]
+        found.sort(key=lambda item: item[0])
+        return found[:limit]
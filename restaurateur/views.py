@@ -1,20 +1,22 @@
-from collections import defaultdict
+import json
+import time
+from datetime import timedelta
 
-import requests
 from django import forms
 from django.conf import settings
 from django.contrib.auth import authenticate, login
 from django.contrib.auth import views as auth_views
 from django.contrib.auth.decorators import user_passes_test
-from django.db.models import Prefetch
-from django.db.models.expressions import OuterRef, Subquery
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch, Q
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import redirect, render
 from django.urls import reverse_lazy
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.views import View
-from geopy import distance
 
-from foodcartapp.models import Order, Product, Restaurant, RestaurantMenuItem
-from places.models import Place
+from foodcartapp.models import Order, OrderCandidate, Product, Restaurant
 
 
 class Login(forms.Form):
@@ -34,6 +36,47 @@ class Login(forms.Form):
     )
 
 
+def make_cursor(moment, order_id):
+    return f'{moment.isoformat()}_{order_id}'
+
+
+def parse_cursor(cursor):
+    moment, _, order_id = cursor.rpartition('_')
+    moment = parse_datetime(moment)
+    if not moment or not order_id.isdigit():
+        raise ValueError(f'Invalid cursor: {cursor}')
+    return moment, int(order_id)
+
+
+class OrdersFilter(forms.Form):
+    status = forms.ChoiceField(
+        label='Статус', required=False,
+        choices=[('', 'Любой'), *Order.order_statuses],
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    payment = forms.ChoiceField(
+        label='Оплата', required=False,
+        choices=[('', 'Любая'), *Order.payment_methods],
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    restaurant = forms.ModelChoiceField(
+        label='Ресторан', required=False,
+        queryset=Restaurant.objects.order_by('name'),
+        empty_label='Любой',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    cursor = forms.CharField(required=False, widget=forms.HiddenInput)
+
+    def clean_cursor(self):
+        cursor = self.cleaned_data['cursor']
+        if not cursor:
+            return None
+        try:
+            return parse_cursor(cursor)
+        except ValueError:
+            raise forms.ValidationError('Неверный курсор')
+
+
 class LoginView(View):
     def get(self, request, *args, **kwargs):
         form = Login()
@@ -101,81 +144,129 @@ def view_restaurants(request):
     })
 
 
-def fetch_coordinates(apikey, address):
-    base_url = "https://geocode-maps.yandex.ru/1.x"
-    response = requests.get(base_url, params={
-        "geocode": address,
-        "apikey": apikey,
-        "format": "json",
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def view_orders(request):
+    filter_form = OrdersFilter(request.GET or {'status': 'not_processed'})
+    filter_form.is_valid()
+    filters = filter_form.cleaned_data
+
+    orders = Order.objects.order_by('-created_at', '-id')
+    if filters.get('status'):
+        orders = orders.filter(processing_status=filters['status'])
+    if filters.get('payment'):
+        orders = orders.filter(payment_method=filters['payment'])
+    if filters.get('restaurant'):
+        orders = orders.filter(restaurant=filters['restaurant'])
+    if filters.get('cursor'):
+        created_at, order_id = filters['cursor']
+        orders = orders.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=order_id))
+
+    page_size = settings.MANAGER_ORDERS_PAGE_SIZE
+    orders = list(
+        orders.
+        prefetch_related(Prefetch('candidates', OrderCandidate.objects.select_related('restaurant'))).
+        get_order_price().
+        with_coordinates()[:page_size + 1]
+    )
+
+    next_page_url = None
+    if len(orders) > page_size:
+        orders = orders[:page_size]
+        last_order = orders[-1]
+        next_page_params = request.GET.copy()
+        next_page_params.setdefault('status', 'not_processed')
+        next_page_params['cursor'] = make_cursor(last_order.created_at, last_order.id)
+        next_page_url = f'?{next_page_params.urlencode()}'
+
+    return render(request, template_name='order_items.html', context={
+        'orders': orders,
+        'filter_form': filter_form,
+        'next_page_url': next_page_url,
     })
-    response.raise_for_status()
-    found_places = response.json()['response']['GeoObjectCollection']['featureMember']
 
-    if not found_places:
-        return None
 
-    most_relevant = found_places[0]
-    lon, lat = most_relevant['GeoObject']['Point']['pos'].split(" ")
-    return lon, lat
+def serialize_order(order):
+    return {
+        'id': order.id,
+        'price': order.price,
+        'firstname': order.firstname,
+        'lastname': order.lastname,
+        'phonenumber': str(order.phonenumber),
+        'address': order.address,
+        'status': order.processing_status,
+        'payment': order.payment_method,
+        'comment': order.comment,
+        'restaurant': order.restaurant_id,
+        'is_geocoded': order.is_geocoded,
+        'created_at': order.created_at,
+        'updated_at': order.updated_at,
+        'candidates': [
+            {
+                'restaurant': candidate.restaurant_id,
+                'name': candidate.restaurant.name,
+                'distance': candidate.distance,
+            }
+            for candidate in order.candidates.all()
+        ],
+    }
+
+
+def get_order_changes(since=None):
+    # updated_at is taken before commit, so a slow transaction may commit
+    # an order older than the cursor; changes are held back until every
+    # transaction that could have made them has finished
+    settled_at = timezone.now() - timedelta(seconds=settings.CHANGES_FEED_LAG)
+    orders = Order.objects.filter(updated_at__lte=settled_at).order_by('updated_at', 'id')
+    if since:
+        updated_at, order_id = since
+        orders = orders.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=order_id))
+    orders = list(
+        orders.
+        prefetch_related(Prefetch('candidates', OrderCandidate.objects.select_related('restaurant'))).
+        get_order_price().
+        with_coordinates()[:settings.MANAGER_ORDERS_PAGE_SIZE]
+    )
+    if orders:
+        since = orders[-1].updated_at, orders[-1].id
+    return [serialize_order(order) for order in orders], since and make_cursor(*since)
 
 
 @user_passes_test(is_manager, login_url='restaurateur:login')
-def view_orders(request):
-    apikey = settings.YA_MAPS_API_KEY
-
-    places = Place.objects.all()
-    orders = Order.objects. \
-        filter(processing_status='not_processed'). \
-        order_by('-created_at'). \
-        prefetch_related(Prefetch('order_items__product')). \
-        get_order_price(). \
-        annotate(lon=Subquery(places.filter(address=OuterRef('address')).values('lon')),
-                 lat=Subquery(places.filter(address=OuterRef('address')).values('lat')))
-
-    db_addresses = Place.objects.all().values_list('address', flat=True)
-    addresses_to_add = list(Restaurant.objects.exclude(address__in=db_addresses).values_list('address', flat=True))
-    addresses_to_add.extend(list(orders.exclude(address__in=db_addresses).values_list('address', flat=True)))
-    for address in addresses_to_add:
-        coordinates = fetch_coordinates(apikey, address)
-        if coordinates:
-            lon, lat = coordinates
-            Place.objects.create(
-                address=address,
-                lon=lon,
-                lat=lat
-            )
-        else:
-            Place.objects.create(address=address)
-
-    restaurantmenus = RestaurantMenuItem.objects. \
-        filter(availability=True). \
-        select_related('product'). \
-        select_related('restaurant')
-    restaurants_items = defaultdict(list)
-    for restaurantmenu in restaurantmenus:
-        restaurants_items[restaurantmenu.restaurant].append(restaurantmenu.product.id)
-
-    order_restaurants = {}
-    for order in orders:
-
-        order_item_ids = [order_item.product.id for order_item in order.order_items.all()]
-        order_restaurants[order.id] = []
-        for rest in restaurants_items.keys():
-            if (order.lon and order.lat and
-                    all(product in restaurants_items[rest] for product in order_item_ids)):
-
-                rest_lon_lat = [(place.lon, place.lat) for place in places if place.address == rest.address][0]
-                dist = round(distance.distance(
-                        (order.lon, order.lat), rest_lon_lat
-                    ).km, 2)
-                order_restaurants[order.id].append({
-                    'name': rest.name,
-                    'distance': str(dist)
-                })
-
-    for order in order_restaurants:
-        sorted_rests = sorted(order_restaurants[order], key=lambda rest: float(rest['distance']))
-        order_restaurants[order] = sorted_rests
-    return render(request, template_name='order_items.html', context={
-        'orders': orders, 'restaurants': order_restaurants
-    })
+def view_order_changes(request):
+    try:
+        since = parse_cursor(request.GET['since']) if request.GET.get('since') else None
+    except ValueError:
+        return JsonResponse({'error': 'Неверный курсор'}, status=400)
+
+    orders, cursor = get_order_changes(since)
+    return JsonResponse({
+        'orders': orders,
+        'cursor': cursor,
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def stream_order_changes(request):
+    since = request.headers.get('Last-Event-ID') or request.GET.get('since')
+    try:
+        since = parse_cursor(since) if since else None
+    except ValueError:
+        return JsonResponse({'error': 'Неверный курсор'}, status=400)
+
+    def generate_events(since):
+        deadline = time.monotonic() + settings.MANAGER_FEED_STREAM_TIMEOUT
+        yield f'retry: {int(settings.MANAGER_FEED_POLL_INTERVAL * 1000)}\n\n'
+        while time.monotonic() < deadline:
+            orders, cursor = get_order_changes(since)
+            if orders:
+                since = parse_cursor(cursor)
+                data = json.dumps(orders, cls=DjangoJSONEncoder, ensure_ascii=False)
+                yield f'id: {cursor}\nevent: orders\ndata: {data}\n\n'
+                continue
+            yield ': keep-alive\n\n'
+            time.sleep(settings.MANAGER_FEED_POLL_INTERVAL)
+
+    response = StreamingHttpResponse(generate_events(since), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
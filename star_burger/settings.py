@@ -11,6 +11,35 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
 YA_MAPS_API_KEY = env('YA_MAPS_API_KEY')
+GEOCODER_MAX_WORKERS = env.int('GEOCODER_MAX_WORKERS', 10)
+GEOCODER_TIMEOUT = env.float('GEOCODER_TIMEOUT', 5)
+GEOCODER_CACHE_TTL = env.int('GEOCODER_CACHE_TTL', 30 * 24 * 60 * 60)
+GEOCODER_NEGATIVE_CACHE_TTL = env.int('GEOCODER_NEGATIVE_CACHE_TTL', 24 * 60 * 60)
+GEOCODER_MAX_ATTEMPTS = env.int('GEOCODER_MAX_ATTEMPTS', 5)
+GEOCODER_RETRY_DELAY = env.int('GEOCODER_RETRY_DELAY', 60)
+DISTANCE_MODEL = env.str('DISTANCE_MODEL', 'haversine')
+ORDER_CANDIDATES_LIMIT = env.int('ORDER_CANDIDATES_LIMIT', 5)
+ORDER_CANDIDATES_RADIUS_KM = env.float('ORDER_CANDIDATES_RADIUS_KM', 50)
+MANAGER_ORDERS_PAGE_SIZE = env.int('MANAGER_ORDERS_PAGE_SIZE', 50)
+MANAGER_FEED_POLL_INTERVAL = env.float('MANAGER_FEED_POLL_INTERVAL', 2)
+MANAGER_FEED_STREAM_TIMEOUT = env.float('MANAGER_FEED_STREAM_TIMEOUT', 60)
+CHANGES_FEED_LAG = env.float('CHANGES_FEED_LAG', 5)
+CATALOG_CHANGES_RETENTION = env.int('CATALOG_CHANGES_RETENTION', 30 * 24 * 60 * 60)
+PRODUCTS_PAGE_MAX_SIZE = env.int('PRODUCTS_PAGE_MAX_SIZE', 100)
+IDEMPOTENCY_KEY_TTL = env.int('IDEMPOTENCY_KEY_TTL', 24 * 60 * 60)
+IDEMPOTENCY_LOCK_TIMEOUT = env.int('IDEMPOTENCY_LOCK_TIMEOUT', 30)
+ORDER_GROUP_COMMIT = env.bool('ORDER_GROUP_COMMIT', False)
+ORDER_GROUP_COMMIT_DELAY = env.float('ORDER_GROUP_COMMIT_DELAY', 5)
+ORDER_GROUP_COMMIT_BATCH_SIZE = env.int('ORDER_GROUP_COMMIT_BATCH_SIZE', 100)
+TRUSTED_PROXIES_COUNT = env.int('TRUSTED_PROXIES_COUNT', 0)
+ORDER_RATE_LIMIT = env.float('ORDER_RATE_LIMIT', 10)
+ORDER_RATE_LIMIT_BURST = env.int('ORDER_RATE_LIMIT_BURST', 5)
+CATALOG_RATE_LIMIT = env.float('CATALOG_RATE_LIMIT', 300)
+CATALOG_RATE_LIMIT_BURST = env.int('CATALOG_RATE_LIMIT_BURST', 60)
+PARTNER_API_TOKENS = env.list('PARTNER_API_TOKENS', [])
+ORDER_IMPORT_CHUNK_SIZE = env.int('ORDER_IMPORT_CHUNK_SIZE', 100)
+ORDER_IMPORT_RATE_LIMIT = env.float('ORDER_IMPORT_RATE_LIMIT', 6)
+ORDER_IMPORT_RATE_LIMIT_BURST = env.int('ORDER_IMPORT_RATE_LIMIT_BURST', 3)
 SECRET_KEY = env('SECRET_KEY', 'etirgvonenrfnoerngorenogneongg334g')
 DEBUG = env.bool('DEBUG', True)
 
@@ -88,6 +117,10 @@ DATABASES = {
     'default': dj_database_url.config(default=env('DATABASE_URL'))
 }
 
+CACHES = {
+    'default': env.dj_cache_url('CACHE_URL', 'locmem://')
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',